@@ -4,8 +4,9 @@ Run with: streamlit run streamlit_app.py
 """
 
 import streamlit as st
-from models import Trip
-from calculator import calculate_settlements, format_settlement_summary
+from models import RecurringPayment, Trip
+from calculator import calculate_settlements, calculate_pairwise_settlements, format_settlement_summary
+from scenarios import Scenario, evaluate_scenarios
 
 # Page config
 st.set_page_config(
@@ -19,6 +20,15 @@ if 'trip' not in st.session_state:
     st.session_state.trip = None
 if 'form_key' not in st.session_state:
     st.session_state.form_key = 0
+if 'pending_removal' not in st.session_state:
+    st.session_state.pending_removal = None
+
+def toast_event(event):
+    """Show trip events as toasts; they survive the st.rerun() after a change"""
+    if event.kind.endswith(("not_found", "exists", "blocked", "invalid")):
+        st.toast(event.message, icon="⚠️")
+    elif not event.kind.endswith("listed"):
+        st.toast(event.message, icon="✅")
 
 # Custom CSS for better styling
 st.markdown("""
@@ -77,23 +87,6 @@ st.markdown("""
         transform: translateY(-2px);
     }
     
-    /* Tabs styling */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        background-color: #e2e8f0;
-        color: #4a5568;
-        border-radius: 8px 8px 0 0;
-        padding: 0.5rem 1rem;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background-color: #4a5568;
-        color: white;
-    }
-    
     /* Form elements */
     .stTextInput input, .stNumberInput input, .stSelectbox select {
         background-color: #f7fafc;
@@ -130,6 +123,7 @@ with st.sidebar:
         if st.button("Create Trip", type="primary"):
             if trip_name.strip():
                 st.session_state.trip = Trip(trip_name.strip())
+                st.session_state.trip.subscribe(toast_event)
                 st.success(f"✅ Trip '{trip_name}' created!")
                 st.rerun()
             else:
@@ -137,256 +131,385 @@ with st.sidebar:
     else:
         st.success(f"📍 **{st.session_state.trip.trip_name}**")
         st.write(f"👥 Members: {len(st.session_state.trip.members)}")
-        st.write(f"💰 Payments: {len(st.session_state.trip.payments)}")
+        st.write(f"💰 Payments: {len(st.session_state.trip.payments) + len(st.session_state.trip.recurring_payments)}")
         
         if st.button("🔄 Reset Trip", type="secondary"):
             st.session_state.trip = None
             st.rerun()
 
-# Main content
-if st.session_state.trip is None:
-    st.info("👈 Create a trip to get started!")
-else:
-    trip = st.session_state.trip
-    
-    # Tabs for different sections
-    tab1, tab2, tab3, tab4 = st.tabs(["👥 Members", "💳 Payments", "✏️ Edit/Delete", "💰 Settlement"])
-    
-    # TAB 1: Members Management
-    with tab1:
-        col1, col2 = st.columns([2, 1])
-        
-        with col1:
-            st.subheader("Add Member")
-            new_member = st.text_input("Member Name", key=f"new_member_{st.session_state.form_key}", placeholder="e.g., Alice")
-            if st.button("Add Member", type="primary"):
-                if new_member.strip():
-                    if trip.add_member(new_member.strip()):
-                        st.success(f"✅ {new_member} added!")
-                        st.session_state.form_key += 1  # Increment to refresh form
-                        st.rerun()
-                else:
-                    st.error("Please enter a name")
-        
-        with col2:
-            st.subheader("Current Members")
-            if trip.members:
-                for name in trip.members.keys():
-                    col_name, col_btn = st.columns([3, 1])
-                    with col_name:
-                        st.write(f"👤 {name}")
-                    with col_btn:
-                        if st.button("❌", key=f"remove_{name}"):
-                            trip.remove_member(name)
-                            st.rerun()
+# Each section, and each payment editor, is a fragment: interacting with a widget
+# inside one only reruns that fragment. Mutations that other parts of the page
+# depend on (members, payments) still call st.rerun() to refresh the whole app.
+
+@st.fragment
+def members_section(trip):
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        st.subheader("Add Member")
+        new_member = st.text_input("Member Name", key=f"new_member_{st.session_state.form_key}", placeholder="e.g., Alice")
+        if st.button("Add Member", type="primary"):
+            if new_member.strip():
+                if trip.add_member(new_member.strip()):
+                    st.success(f"✅ {new_member} added!")
+                    st.session_state.form_key += 1  # Increment to refresh form
+                    st.rerun()
             else:
-                st.info("No members yet")
-    
-    # TAB 2: Add Payments
-    with tab2:
-        st.subheader("Record New Payment")
-        
-        if not trip.members:
-            st.warning("⚠️ Add members first before recording payments!")
-        else:
-            # Checkbox outside form to make it interactive
-            split_specific = st.checkbox("Split among specific members only", value=False, key="split_choice")
-            
-            # Show multiselect if splitting among specific members
-            involved = None
-            if split_specific:
-                st.write("**Who is involved in this expense?**")
-                involved = st.multiselect(
-                    "Select members",
-                    options=list(trip.members.keys()),
-                    label_visibility="collapsed",
-                    key="involved_members"
+                st.error("Please enter a name")
+
+    with col2:
+        st.subheader("Current Members")
+        if trip.members:
+            for name in list(trip.members.keys()):
+                col_name, col_btn = st.columns([3, 1])
+                with col_name:
+                    st.write(f"👤 {name}")
+                with col_btn:
+                    if st.button("❌", key=f"remove_{name}"):
+                        if trip.remove_member(name):
+                            st.rerun()
+                        st.session_state.pending_removal = name
+
+            # Member still has payments: ask what to do with them
+            pending = st.session_state.get('pending_removal')
+            if pending in trip.members:
+                involved = trip.payments_involving(pending)
+                st.warning(f"⚠️ {pending} is involved in {len(involved)} payment(s)")
+                others = [m for m in trip.members if m != pending]
+                action = st.radio(
+                    "What should happen to their payments?",
+                    options=["Delete / drop from splits", "Reassign to another member"],
+                    key="removal_mode"
                 )
-            
-            with st.form(f"payment_form_{st.session_state.form_key}", clear_on_submit=True):
+                reassign_to = None
+                if action == "Reassign to another member":
+                    reassign_to = st.selectbox("Reassign to", options=others, key="removal_target")
+                col_ok, col_cancel = st.columns(2)
+                with col_ok:
+                    if st.button("Confirm", key="confirm_removal", disabled=(action != "Delete / drop from splits" and not others)):
+                        mode = "cascade" if reassign_to is None else "reassign"
+                        trip.remove_member(pending, mode=mode, reassign_to=reassign_to)
+                        st.session_state.pending_removal = None
+                        st.rerun()
+                with col_cancel:
+                    if st.button("Cancel", key="cancel_removal"):
+                        st.session_state.pending_removal = None
+                        st.rerun(scope="fragment")
+        else:
+            st.info("No members yet")
+
+
+@st.fragment
+def payments_section(trip):
+    st.subheader("Record New Payment")
+
+    if not trip.members:
+        st.warning("⚠️ Add members first before recording payments!")
+    else:
+        # Checkbox outside form to make it interactive
+        split_specific = st.checkbox("Split among specific members only", value=False, key="split_choice")
+
+        # Show multiselect if splitting among specific members
+        involved = None
+        if split_specific:
+            st.write("**Who is involved in this expense?**")
+            involved = st.multiselect(
+                "Select members",
+                options=list(trip.members.keys()),
+                label_visibility="collapsed",
+                key="involved_members"
+            )
+
+        recurring = st.checkbox("Recurring payment (e.g. nightly hotel)", value=False, key="recurring_choice")
+
+        with st.form(f"payment_form_{st.session_state.form_key}", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+
+            with col1:
+                payer = st.selectbox("Who paid?", options=list(trip.members.keys()))
+
+            with col2:
+                description = st.text_input("Description", placeholder="e.g., Hotel booking")
+
+            amount = st.number_input("Amount ($)", value=0.01, step=0.01, format="%.2f", key=f"amount_{st.session_state.form_key}")
+
+            if recurring:
                 col1, col2 = st.columns(2)
-                
                 with col1:
-                    payer = st.selectbox("Who paid?", options=list(trip.members.keys()))
-                
+                    period_days = st.number_input("Repeat every (days)", min_value=1, value=1, step=1)
                 with col2:
-                    description = st.text_input("Description", placeholder="e.g., Hotel booking")
-                
-                amount = st.number_input("Amount ($)", value=0.01, step=0.01, format="%.2f", key=f"amount_{st.session_state.form_key}")
-                
-                submitted = st.form_submit_button("Add Payment", type="primary")
-                
-                if submitted:
-                    try:
-                        # Validate amount first
-                        if amount <= 0:
-                            st.error("❌ Amount must be greater than $0!")
-                        # Validate members selection
-                        elif split_specific and not involved:
-                            st.error("Please select at least one member to split with!")
+                    count = st.number_input("Number of times", min_value=1, value=2, step=1)
+
+            submitted = st.form_submit_button("Add Payment", type="primary")
+
+            if submitted:
+                try:
+                    # Validate amount first
+                    if amount <= 0:
+                        st.error("❌ Amount must be greater than $0!")
+                    # Validate members selection
+                    elif split_specific and not involved:
+                        st.error("Please select at least one member to split with!")
+                    else:
+                        # Ensure payer is included if specific split
+                        if split_specific and involved and payer not in involved:
+                            involved.append(payer)
+
+                        if recurring:
+                            trip.add_recurring_payment(payer, amount, description, involved if split_specific else None,
+                                                       period_days=int(period_days), count=int(count))
                         else:
-                            # Ensure payer is included if specific split
-                            if split_specific and involved and payer not in involved:
-                                involved.append(payer)
-                            
                             trip.add_payment(payer, amount, description, involved if split_specific else None)
-                            st.success(f"✅ Payment recorded: {payer} paid ${amount:.2f}")
-                            st.session_state.form_key += 1  # Increment to refresh form
-                            st.rerun()
-                    except ValueError as e:
-                        st.error(f"Error: {e}")
-        
-        # Display all payments
-        st.divider()
-        st.subheader("All Payments")
-        
-        if trip.payments:
-            for payment in trip.payments:
-                involved_str = ", ".join(payment.involved_members) if payment.involved_members else "all"
-                desc_text = payment.description if payment.description else "(no description)"
-                st.markdown(f"""
-                    <div class="payment-card">
-                        <strong>#{payment.id}</strong> | 
-                        <strong>{payment.payer_name}</strong> paid 
-                        <strong>${payment.amount:.2f}</strong> - 
-                        {desc_text}<br>
-                        <small>👥 Split between: {involved_str}</small>
-                    </div>
-                """, unsafe_allow_html=True)
-        else:
-            st.info("No payments recorded yet")
-    
-    # TAB 3: Edit/Delete Payments
-    with tab3:
-        if not trip.payments:
-            st.info("No payments to edit or delete")
-        else:
-            st.subheader("Edit or Delete Payments")
-            
-            # Show all payments with actions
-            for payment in trip.payments:
-                involved_str = ", ".join(payment.involved_members) if payment.involved_members else "all"
-                with st.expander(f"#{payment.id}: {payment.payer_name} - ${payment.amount:.2f} - {payment.description} (split: {involved_str})"):
-                    col1, col2 = st.columns([2, 2])
-                    
-                    with col1:
-                        new_amount = st.number_input(
-                            "New Amount",
-                            value=float(payment.amount),
-                            step=0.01,
-                            key=f"edit_amount_{payment.id}"
-                        )
-                    
-                    with col2:
-                        new_desc = st.text_input(
-                            "New Description",
-                            value=payment.description,
-                            key=f"edit_desc_{payment.id}"
-                        )
-                    
-                    # Edit involved members
-                    st.write("**Involved Members:**")
-                    new_involved = st.multiselect(
-                        "Select members involved in this expense",
-                        options=list(trip.members.keys()),
-                        default=payment.involved_members,
-                        key=f"edit_involved_{payment.id}"
-                    )
-                    
-                    col_save, col_delete = st.columns([1, 1])
-                    
-                    with col_save:
-                        if st.button("💾 Save Changes", key=f"save_{payment.id}", use_container_width=True):
-                            if new_amount <= 0:
-                                st.error("Amount must be greater than 0")
-                            elif not new_involved:
-                                st.error("At least one member must be involved")
-                            else:
-                                trip.edit_payment(payment.id, new_amount, new_desc, new_involved)
-                                st.success(f"✅ Payment #{payment.id} updated!")
-                                st.rerun()
-                    
-                    with col_delete:
-                        if st.button(f"🗑️ Delete", key=f"delete_{payment.id}", type="secondary", use_container_width=True):
-                            trip.delete_payment(payment.id)
-                            st.success(f"✅ Payment #{payment.id} deleted!")
-                            st.rerun()
-    
-    # TAB 4: Settlement
-    with tab4:
-        st.subheader("💰 Calculate Settlement")
-        
-        if not trip.payments:
-            st.warning("⚠️ No payments recorded yet!")
-        else:
-            if st.button("Calculate Settlement", type="primary", use_container_width=True):
-                # Calculate balances
-                avg_per_person = trip.calculate_balances()
-                total_spent = sum(p.amount for p in trip.payments)
-                
-                # Display summary
-                col1, col2 = st.columns(2)
+                        st.success(f"✅ Payment recorded: {payer} paid ${amount:.2f}")
+                        st.session_state.form_key += 1  # Increment to refresh form
+                        st.rerun()
+                except ValueError as e:
+                    st.error(f"Error: {e}")
+
+    # Display all payments
+    st.divider()
+    st.subheader("All Payments")
+
+    if trip.payments or trip.recurring_payments:
+        # One markdown element for every card instead of one per payment
+        cards = []
+        for payment in trip.payments + trip.recurring_payments:
+            involved_str = ", ".join(payment.involved_members) if payment.involved_members else "all"
+            desc_text = payment.description if payment.description else "(no description)"
+            repeat_text = ""
+            if isinstance(payment, RecurringPayment):
+                repeat_text = f" 🔁 every {payment.period_days} day(s) × {payment.count} = <strong>${payment.total:.2f}</strong> -"
+            cards.append(f"""
+                <div class="payment-card">
+                    <strong>#{payment.id}</strong> | 
+                    <strong>{payment.payer_name}</strong> paid 
+                    <strong>${payment.amount:.2f}</strong> -{repeat_text} 
+                    {desc_text}<br>
+                    <small>👥 Split between: {involved_str}</small>
+                </div>
+            """)
+        st.markdown("".join(cards), unsafe_allow_html=True)
+    else:
+        st.info("No payments recorded yet")
+
+
+def edit_section(trip):
+    if not trip.payments and not trip.recurring_payments:
+        st.info("No payments to edit or delete")
+    else:
+        st.subheader("Edit or Delete Payments")
+
+        # Show all payments with actions
+        for payment in trip.payments + trip.recurring_payments:
+            payment_editor(trip, payment)
+
+
+@st.fragment
+def payment_editor(trip, payment):
+    involved_str = ", ".join(payment.involved_members) if payment.involved_members else "all"
+    repeat_str = f" every {payment.period_days} day(s) × {payment.count}" if isinstance(payment, RecurringPayment) else ""
+    with st.expander(f"#{payment.id}: {payment.payer_name} - ${payment.amount:.2f}{repeat_str} - {payment.description} (split: {involved_str})"):
+        col1, col2 = st.columns([2, 2])
+
+        with col1:
+            new_amount = st.number_input(
+                "New Amount",
+                value=float(payment.amount),
+                step=0.01,
+                key=f"edit_amount_{payment.id}"
+            )
+
+        with col2:
+            new_desc = st.text_input(
+                "New Description",
+                value=payment.description,
+                key=f"edit_desc_{payment.id}"
+            )
+
+        # Edit involved members
+        st.write("**Involved Members:**")
+        new_involved = st.multiselect(
+            "Select members involved in this expense",
+            options=list(trip.members.keys()),
+            default=payment.involved_members,
+            key=f"edit_involved_{payment.id}"
+        )
+
+        col_save, col_delete = st.columns([1, 1])
+
+        with col_save:
+            if st.button("💾 Save Changes", key=f"save_{payment.id}", use_container_width=True):
+                if new_amount <= 0:
+                    st.error("Amount must be greater than 0")
+                elif not new_involved:
+                    st.error("At least one member must be involved")
+                else:
+                    trip.edit_payment(payment.id, new_amount, new_desc, new_involved)
+                    st.success(f"✅ Payment #{payment.id} updated!")
+                    st.rerun()
+
+        with col_delete:
+            if st.button(f"🗑️ Delete", key=f"delete_{payment.id}", type="secondary", use_container_width=True):
+                trip.delete_payment(payment.id)
+                st.success(f"✅ Payment #{payment.id} deleted!")
+                st.rerun()
+
+
+@st.fragment
+def settlement_section(trip):
+    st.subheader("💰 Calculate Settlement")
+
+    if not trip.payments and not trip.recurring_payments:
+        st.warning("⚠️ No payments recorded yet!")
+    else:
+        mode = st.radio(
+            "Settlement mode",
+            options=["Simplified (fewest transfers)", "Direct debts (who paid for whom)"],
+            horizontal=True,
+            key="settlement_mode"
+        )
+        if st.button("Calculate Settlement", type="primary", use_container_width=True):
+            # Calculate balances
+            avg_per_person = trip.calculate_balances()
+            total_spent = trip.total_spent()
+
+            # Display summary
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Total Spent", f"${total_spent:.2f}")
+            with col2:
+                st.metric("Per Person (if all shared)", f"${avg_per_person:.2f}")
+
+            st.divider()
+
+            # Display balances
+            st.subheader("Current Balances")
+
+            for name, member in trip.members.items():
+                col1, col2 = st.columns([3, 1])
                 with col1:
-                    st.metric("Total Spent", f"${total_spent:.2f}")
+                    st.write(f"**{name}**")
                 with col2:
-                    st.metric("Per Person (if all shared)", f"${avg_per_person:.2f}")
-                
-                st.divider()
-                
-                # Display balances
-                st.subheader("Current Balances")
-                
-                for name, member in trip.members.items():
-                    col1, col2 = st.columns([3, 1])
-                    with col1:
-                        st.write(f"**{name}**")
-                    with col2:
-                        if member.balance > 0.01:
-                            st.success(f"${member.balance:.2f} (owed)")
-                        elif member.balance < -0.01:
-                            st.error(f"${abs(member.balance):.2f} (owes)")
-                        else:
-                            st.info("$0.00 (settled)")
-                
-                st.divider()
-                
-                # Calculate settlements
-                balance_list = trip.get_balance_list()
-                final_balances, settlements = calculate_settlements(balance_list)
-                
-                # Display settlements
-                st.subheader("💸 Required Transactions")
-                
-                # Build clipboard text
-                clipboard_text = f"💰 Settlement for {trip.trip_name}\n\n"
-                clipboard_text += f"Total spent: ${total_spent:.2f}\n"
-                clipboard_text += f"Per person (if all shared): ${avg_per_person:.2f}\n\n"
-                clipboard_text += "Balances:\n"
-                for name, member in trip.members.items():
                     if member.balance > 0.01:
-                        clipboard_text += f"  {name}: ${member.balance:.2f} (is owed)\n"
+                        st.success(f"${member.balance:.2f} (owed)")
                     elif member.balance < -0.01:
-                        clipboard_text += f"  {name}: ${abs(member.balance):.2f} (owes)\n"
+                        st.error(f"${abs(member.balance):.2f} (owes)")
                     else:
-                        clipboard_text += f"  {name}: $0.00 (settled)\n"
-                
-                clipboard_text += "\nRequired Transactions:\n"
-                
-                if settlements:
-                    for i, s in enumerate(settlements, 1):
-                        st.markdown(f"""
-                            <div class="payment-card">
-                                <strong>{i}.</strong> 
-                                {s['debtor']} → {s['creditor']}: 
-                                <strong>${s['amount']:.2f}</strong>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        clipboard_text += f"  {i}. {s['debtor']} → {s['creditor']}: ${s['amount']:.2f}\n"
-                    
-                    st.success(f"✅ Total transactions needed: {len(settlements)}")
-                    clipboard_text += f"\nTotal transactions: {len(settlements)}"
+                        st.info("$0.00 (settled)")
+
+            st.divider()
+
+            # Calculate settlements
+            if mode == "Direct debts (who paid for whom)":
+                obligations = trip.get_obligation_matrix()
+                final_balances, settlements = calculate_pairwise_settlements(obligations)
+
+                # Matrix view: row owes column, before netting
+                st.subheader("🧾 Who Owes Whom")
+                names = list(trip.members.keys())
+                matrix = {
+                    creditor: {debtor: round(obligations.get(debtor, {}).get(creditor, 0), 2) for debtor in names}
+                    for creditor in names
+                }
+                st.dataframe(matrix, use_container_width=True)
+                st.caption("Each row owes each column, before reciprocal debts are netted.")
+                st.divider()
+            else:
+                balance_list = trip.get_balance_list()
+                final_balances, settlements = calculate_settlements(balance_list)
+
+            # Display settlements
+            st.subheader("💸 Required Transactions")
+
+            # Build clipboard text
+            clipboard_text = f"💰 Settlement for {trip.trip_name}\n\n"
+            clipboard_text += f"Total spent: ${total_spent:.2f}\n"
+            clipboard_text += f"Per person (if all shared): ${avg_per_person:.2f}\n\n"
+            clipboard_text += "Balances:\n"
+            for name, member in trip.members.items():
+                if member.balance > 0.01:
+                    clipboard_text += f"  {name}: ${member.balance:.2f} (is owed)\n"
+                elif member.balance < -0.01:
+                    clipboard_text += f"  {name}: ${abs(member.balance):.2f} (owes)\n"
                 else:
-                    st.success("✅ Everyone is settled up!")
-                    clipboard_text += "  Everyone is settled up!"
-            
-                
\ No newline at end of file
+                    clipboard_text += f"  {name}: $0.00 (settled)\n"
+
+            clipboard_text += "\nRequired Transactions:\n"
+
+            if settlements:
+                for i, s in enumerate(settlements, 1):
+                    st.markdown(f"""
+                        <div class="payment-card">
+                            <strong>{i}.</strong> 
+                            {s['debtor']} → {s['creditor']}: 
+                            <strong>${s['amount']:.2f}</strong>
+                        </div>
+                    """, unsafe_allow_html=True)
+                    clipboard_text += f"  {i}. {s['debtor']} → {s['creditor']}: ${s['amount']:.2f}\n"
+
+                st.success(f"✅ Total transactions needed: {len(settlements)}")
+                clipboard_text += f"\nTotal transactions: {len(settlements)}"
+            else:
+                st.success("✅ Everyone is settled up!")
+                clipboard_text += "  Everyone is settled up!"
+
+
+
+        # What-if scenarios
+        st.divider()
+        st.subheader("🔮 What-if Scenarios")
+        payment_labels = {
+            f"#{p.id}: {p.payer_name} - ${p.amount:.2f} - {p.description}": p.id
+            for p in trip.payments + trip.recurring_payments
+        }
+        leaving = st.multiselect("What if ... leaves the trip?", options=list(trip.members.keys()), key="whatif_members")
+        dropped = st.multiselect("What if we drop ...?", options=list(payment_labels.keys()), key="whatif_payments")
+
+        if st.button("Compare Scenarios", use_container_width=True, disabled=not (leaving or dropped)):
+            scenarios = [Scenario("Current")]
+            scenarios += [Scenario(f"{name} leaves").without_member(name) for name in leaving]
+            scenarios += [Scenario(f"Drop {label.split(':')[0]}").without_payment(payment_labels[label]) for label in dropped]
+            results = evaluate_scenarios(trip, scenarios)
+
+            # One column per scenario, one row per member
+            table = {}
+            for result in results:
+                column = {b['member_name']: round(b['price_to_get'], 2) for b in result['balances']}
+                column["Transactions"] = len(result['settlements'])
+                table[result['scenario']] = column
+            st.dataframe(table, use_container_width=True)
+
+            columns = st.columns(len(results))
+            for col, result in zip(columns, results):
+                with col:
+                    st.markdown(f"**{result['scenario']}**")
+                    if result['settlements']:
+                        for s in result['settlements']:
+                            st.write(f"{s['debtor']} → {s['creditor']}: ${s['amount']:.2f}")
+                    else:
+                        st.write("Everyone is settled up!")
+
+
+# Main content
+if st.session_state.trip is None:
+    st.info("👈 Create a trip to get started!")
+else:
+    trip = st.session_state.trip
+    
+    # Section selector: unlike st.tabs, only the selected section is rendered,
+    # so hidden sections (e.g. one editor per payment) cost nothing on a rerun
+    sections = {
+        "👥 Members": members_section,
+        "💳 Payments": payments_section,
+        "✏️ Edit/Delete": edit_section,
+        "💰 Settlement": settlement_section,
+    }
+    section = st.radio(
+        "Section",
+        options=list(sections.keys()),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="section"
+    )
+    st.divider()
+    sections[section](trip)
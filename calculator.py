@@ -1,8 +1,13 @@
 '''
 Settlement calculation logic for minimizing transactions
 '''
+import hashlib
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque
 
-def calculate_settlements(balance_list: list[dict]) -> tuple:
+def calculate_settlements(balance_list: list[dict], use_cache: bool = True) -> tuple:
     '''
     Calculate minimum transactions needed to settel all debts
 
@@ -10,6 +15,7 @@ def calculate_settlements(balance_list: list[dict]) -> tuple:
         balance_list: List of dicts with member_name and price_to_get
             Positive values = creditor
             Negative values = debtor
+        use_cache: Look the plan up in settlement_cache first
     
     Returns:
         tuple: (final_balances, settlements)
@@ -23,10 +29,75 @@ def calculate_settlements(balance_list: list[dict]) -> tuple:
             raise TypeError(f'Each balance must be a dict.')
         if 'member_name' not in balance or 'price_to_get' not in balance:
             raise KeyError("Each balance dict must have 'member_name' and 'price_to_get'.")
-        
-    balances = [{'member_name': b['member_name'], 'price_to_get': b['price_to_get']}
-                for b in balance_list]
-    return calculate_recursive(balances, [])
+
+    # Canonical form: sorted and rounded to cents, so equal ledgers share one plan
+    canonical = tuple(sorted((b['member_name'], round(b['price_to_get'], 2)) for b in balance_list))
+    key = hashlib.blake2b(repr(canonical).encode('utf-8'), digest_size=16).digest()
+    if use_cache:
+        cached = settlement_cache.get(key)
+        if cached is not None:
+            return _copy_plan(cached)
+
+    balances = [{'member_name': name, 'price_to_get': price_to_get} for name, price_to_get in canonical]
+    plan = calculate_recursive(balances, [])
+    if use_cache:
+        settlement_cache.put(key, _copy_plan(plan))
+    return plan
+
+
+def _copy_plan(plan: tuple) -> tuple:
+    final_balances, settlements = plan
+    return ([dict(b) for b in final_balances], [dict(s) for s in settlements])
+
+
+class SettlementCache:
+    '''
+    Bounded LRU cache of settlement plans, keyed by a hash of the canonical balances.
+    Entries are evicted when the cache is full (least recently used first) or older than max_age seconds.
+    '''
+    def __init__(self, max_size: int = 1024, max_age: float = 3600.0) -> None:
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key: (stored_at, plan)
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.max_age:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: bytes, plan: tuple) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), plan)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"SettlementCache(size = {len(self)}/{self.max_size}, hits = {self.hits}, misses = {self.misses})"
+
+
+# Shared by every trip and session in this process
+settlement_cache = SettlementCache()
 
 
 def calculate_recursive(balances, settlements):
@@ -58,6 +129,40 @@ def calculate_recursive(balances, settlements):
     })
     return calculate_recursive(balances, settlements)
 
+def calculate_pairwise_settlements(obligations: dict) -> tuple:
+    '''
+    Settle debts directly between the people involved, without simplification.
+    Reciprocal debts between two people are netted into one transfer.
+
+    Args:
+        obligations: Sparse {debtor: {creditor: amount}} dict, as from Trip.get_obligation_matrix
+
+    Returns:
+        tuple: (final_balances, settlements) in the same format as calculate_settlements
+    '''
+    if not isinstance(obligations, dict):
+        raise TypeError(f"obligations must be a dict, got {type(obligations)}.")
+
+    members = {}
+    settlements = []
+    for debtor, row in obligations.items():
+        members[debtor] = 0.0
+        for creditor, amount in row.items():
+            members[creditor] = 0.0
+            # handle each pair once, from whichever side comes first
+            reverse = obligations.get(creditor, {}).get(debtor, 0)
+            if reverse and debtor > creditor:
+                continue
+            net = amount - reverse
+            if round(net, 2) > 0:
+                settlements.append({'debtor': debtor, 'creditor': creditor, 'amount': net})
+            elif round(net, 2) < 0:
+                settlements.append({'debtor': creditor, 'creditor': debtor, 'amount': -net})
+
+    final_balances = [{'member_name': name, 'price_to_get': 0.0} for name in members]
+    return (final_balances, settlements)
+
+
 def format_settlement_summary(balances, settlements) -> str:
     '''
     Format settlement information as a readable string
@@ -77,4 +182,198 @@ def format_settlement_summary(balances, settlements) -> str:
     else:
         lines.append("No transactions needed - all settled!")
     
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
+
+def calculate_constrained_settlements(balance_list: list[dict], allowed: dict = None, caps: dict = None,
+                                      costs: dict = None) -> tuple:
+    '''
+    Calculate settlements that respect group rules, solved as a min-cost flow
+
+    Every debtor is a source of their debt and every creditor a sink of their
+    credit. Money can only move along allowed debtor → creditor edges, up to
+    the edge cap, and the cheapest total cost is chosen.
+
+    Limits on how many transfers a member makes are not supported: they are
+    not flow constraints, and deciding them exactly is as hard as bin packing.
+    Use allowed to restrict who pays whom instead.
+
+    Args:
+        balance_list: List of dicts with member_name and price_to_get
+        allowed: {debtor: creditors they may pay}. Debtors not listed may pay anyone.
+        caps: {(debtor, creditor): largest amount allowed on that transfer}
+        costs: {(debtor, creditor): cost per dollar}, defaults to 1 for every edge
+
+    Returns:
+        tuple: (final_balances, settlements) in the same format as calculate_settlements
+
+    Raises:
+        ValueError: If no settlement satisfies the constraints
+    '''
+    if not isinstance(balance_list, list):
+        raise TypeError(f"balance_list must be a list, got {type(balance_list)}.")
+    for balance in balance_list:
+        if not isinstance(balance, dict):
+            raise TypeError(f'Each balance must be a dict.')
+        if 'member_name' not in balance or 'price_to_get' not in balance:
+            raise KeyError("Each balance dict must have 'member_name' and 'price_to_get'.")
+    allowed = allowed or {}
+    caps = caps or {}
+    costs = costs or {}
+
+    # Work in cents so the flow is exact
+    cents = {b['member_name']: int(round(b['price_to_get'] * 100)) for b in balance_list}
+    debtors = [name for name, amount in cents.items() if amount < 0]
+    creditors = [name for name, amount in cents.items() if amount > 0]
+    total = sum(-cents[name] for name in debtors)
+
+    network = _FlowNetwork(len(debtors) + len(creditors) + 2)
+    source, sink = 0, len(debtors) + len(creditors) + 1
+    creditor_node = {name: len(debtors) + 1 + i for i, name in enumerate(creditors)}
+    transfer_edges = []
+    for i, debtor in enumerate(debtors, 1):
+        network.add_edge(source, i, -cents[debtor], 0)
+        payees = allowed.get(debtor)
+        for creditor in (creditors if payees is None else [c for c in creditors if c in payees]):
+            cap = caps.get((debtor, creditor))
+            cap = total if cap is None else min(total, int(round(cap * 100)))
+            edge = network.add_edge(i, creditor_node[creditor], cap, costs.get((debtor, creditor), 1))
+            transfer_edges.append((debtor, creditor, edge))
+    for creditor in creditors:
+        network.add_edge(creditor_node[creditor], sink, cents[creditor], 0)
+
+    flow = network.min_cost_flow(source, sink)
+    # Rounding to cents can only leave the gap between total debts and total credits,
+    # which the min() already accounts for; any other shortfall is a constraint violation
+    if flow < min(total, sum(cents[name] for name in creditors)):
+        raise ValueError("No settlement satisfies the given constraints.")
+
+    settlements = []
+    for debtor, creditor, edge in transfer_edges:
+        amount = network.flow(edge)
+        if amount:
+            cents[debtor] += amount
+            cents[creditor] -= amount
+            settlements.append({
+                'debtor': debtor,
+                'creditor': creditor,
+                'amount': amount / 100
+            })
+
+    final_balances = sorted(
+        ({'member_name': name, 'price_to_get': amount / 100} for name, amount in cents.items()),
+        key=lambda b: b['price_to_get'], reverse=True
+    )
+    return (final_balances, settlements)
+
+
+class _FlowNetwork:
+    '''
+    Residual graph for min-cost flow. Edge e and its reverse are stored at e and e ^ 1.
+    '''
+    def __init__(self, num_nodes: int) -> None:
+        self.adjacent = [[] for _ in range(num_nodes)]
+        self.to = []
+        self.cap = []
+        self.cost = []
+
+    def add_edge(self, u: int, v: int, cap: int, cost: float) -> int:
+        edge = len(self.to)
+        self.to += [v, u]
+        self.cap += [cap, 0]
+        self.cost += [cost, -cost]
+        self.adjacent[u].append(edge)
+        self.adjacent[v].append(edge + 1)
+        return edge
+
+    def flow(self, edge: int) -> int:
+        return self.cap[edge ^ 1]
+
+    def min_cost_flow(self, source: int, sink: int) -> int:
+        '''
+        Primal-dual min-cost max-flow: Dijkstra on reduced costs finds the
+        cheapest path length, then a Dinic blocking flow pushes everything
+        along paths of that length at once.
+        '''
+        n = len(self.adjacent)
+        potential = [0] * n
+        total_flow = 0
+        while True:
+            dist = self._shortest_paths(source, potential)
+            if dist[sink] == float('inf'):
+                return total_flow
+            for v in range(n):
+                if dist[v] < float('inf'):
+                    potential[v] += dist[v]
+            while True:
+                level = self._levels(source, sink, potential)
+                if level[sink] < 0:
+                    break
+                pointer = [0] * n
+                pushed = self._push(source, sink, level, pointer, potential)
+                while pushed:
+                    total_flow += pushed
+                    pushed = self._push(source, sink, level, pointer, potential)
+
+    def _reduced_cost(self, u: int, edge: int, potential: list) -> float:
+        return self.cost[edge] + potential[u] - potential[self.to[edge]]
+
+    def _shortest_paths(self, source: int, potential: list) -> list:
+        dist = [float('inf')] * len(self.adjacent)
+        dist[source] = 0
+        heap = [(0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for edge in self.adjacent[u]:
+                if self.cap[edge] > 0:
+                    v = self.to[edge]
+                    nd = d + self._reduced_cost(u, edge, potential)
+                    if nd < dist[v] - 1e-9:
+                        dist[v] = nd
+                        heapq.heappush(heap, (nd, v))
+        return dist
+
+    def _levels(self, source: int, sink: int, potential: list) -> list:
+        # BFS over admissible edges only: residual capacity and zero reduced cost
+        level = [-1] * len(self.adjacent)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for edge in self.adjacent[u]:
+                v = self.to[edge]
+                if level[v] < 0 and self.cap[edge] > 0 and abs(self._reduced_cost(u, edge, potential)) < 1e-9:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level
+
+    def _push(self, source: int, sink: int, level: list, pointer: list, potential: list) -> int:
+        # Iterative DFS along the level graph, with Dinic's current-arc pointers
+        path = []
+        u = source
+        while True:
+            if u == sink:
+                pushed = min(self.cap[edge] for edge in path)
+                for edge in path:
+                    self.cap[edge] -= pushed
+                    self.cap[edge ^ 1] += pushed
+                return pushed
+            advanced = False
+            while pointer[u] < len(self.adjacent[u]):
+                edge = self.adjacent[u][pointer[u]]
+                v = self.to[edge]
+                if (self.cap[edge] > 0 and level[v] == level[u] + 1
+                        and abs(self._reduced_cost(u, edge, potential)) < 1e-9):
+                    path.append(edge)
+                    u = v
+                    advanced = True
+                    break
+                pointer[u] += 1
+            if not advanced:
+                if u == source:
+                    return 0
+                # Dead end: retreat and skip the edge that led here
+                edge = path.pop()
+                u = self.to[edge ^ 1]
+                pointer[u] += 1
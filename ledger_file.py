@@ -0,0 +1,190 @@
+'''
+Compact binary ledger format for archiving and reloading large trips
+
+Layout (little-endian):
+    header          magic, version, member count, payment count, involved count
+    trip name       uint16 length + utf-8 bytes
+    member table    uint16 length + utf-8 bytes, per member
+    padding         up to an 8 byte boundary
+    amount          float64[payments]
+    timestamp       float64[payments]
+    payer           uint32[payments]   index into the member table
+    offset          uint32[payments+1] start of each payment in the involved column
+    involved        uint32[involved]   packed member indexes of every split
+    text offset     uint32[payments+1] start of each description in the text blob
+    text            utf-8 descriptions, back to back
+'''
+import mmap
+import struct
+import sys
+from array import array
+from datetime import datetime
+
+from models import Payment, RecurringPayment, Trip
+
+MAGIC = b'STLD'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIII')
+NAME_LENGTH = struct.Struct('<H')
+
+
+def save_ledger(trip: Trip, path: str) -> None:
+    '''
+    Write a trip's members and payments to path in the binary ledger format.
+    Recurring payments are exported as their individual occurrences.
+    '''
+    names = list(trip.members.keys())
+    index = {name: i for i, name in enumerate(names)}
+
+    amounts = array('d')
+    timestamps = array('d')
+    payers = array('I')
+    offsets = array('I', [0])
+    involved = array('I')
+    text_offsets = array('I', [0])
+    text = bytearray()
+    # Recurring rules are expanded into one row per occurrence
+    for day, payment, amount in trip.iter_payments():
+        amounts.append(amount)
+        if isinstance(payment, RecurringPayment):
+            timestamps.append(datetime.combine(day, datetime.min.time()).timestamp())
+        else:
+            timestamps.append(payment.timestamp)
+        payers.append(index[payment.payer_name])
+        involved.extend(index[name] for name in payment.involved_members)
+        offsets.append(len(involved))
+        text += payment.description.encode('utf-8')
+        text_offsets.append(len(text))
+
+    columns = (amounts, timestamps, payers, offsets, involved, text_offsets)
+    if sys.byteorder != 'little':
+        for column in columns:
+            column.byteswap()
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(names), len(payers), len(involved)))
+        for name in [trip.trip_name] + names:
+            encoded = name.encode('utf-8')
+            f.write(NAME_LENGTH.pack(len(encoded)))
+            f.write(encoded)
+        f.write(b'\0' * (-f.tell() % 8))
+        for column in columns:
+            f.write(column.tobytes())
+        f.write(text)
+
+
+def open_ledger(path: str) -> 'MappedLedger':
+    '''
+    Memory-map a binary ledger file
+    '''
+    return MappedLedger(path)
+
+
+class MappedLedger:
+    '''
+    Read-only view over a memory-mapped binary ledger.
+    The payment columns are zero-copy memoryviews into the mapped file.
+    '''
+    def __init__(self, path: str) -> None:
+        if sys.byteorder != 'little':
+            raise OSError("Memory-mapped ledgers require a little-endian platform")
+
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        magic, version, _, num_members, num_payments, num_involved = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a ledger file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported ledger version {version}")
+
+        pos = HEADER.size
+        texts = []
+        for _ in range(num_members + 1):
+            (length,) = NAME_LENGTH.unpack_from(buffer, pos)
+            pos += NAME_LENGTH.size
+            texts.append(bytes(buffer[pos:pos + length]).decode('utf-8'))
+            pos += length
+        pos += -pos % 8
+        self.trip_name = texts[0]
+        self.member_names = texts[1:]
+
+        columns = []
+        for fmt, count in (('d', num_payments), ('d', num_payments), ('I', num_payments),
+                           ('I', num_payments + 1), ('I', num_involved), ('I', num_payments + 1)):
+            size = struct.calcsize(fmt) * count
+            columns.append(buffer[pos:pos + size].cast(fmt))
+            pos += size
+        self.amounts, self.timestamps, self.payers, self.offsets, self.involved, self._text_offsets = columns
+        self._text = buffer[pos:pos + self._text_offsets[-1]]
+        self._buffer = buffer
+        self.balances = [0.0] * num_members
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        for column in (self.amounts, self.timestamps, self.payers, self.offsets, self.involved,
+                       self._text_offsets, self._text):
+            column.release()
+        self._buffer.release()
+        self._mmap.close()
+
+    def description(self, i: int) -> str:
+        return bytes(self._text[self._text_offsets[i]:self._text_offsets[i + 1]]).decode('utf-8')
+
+    def calculate_balances(self):
+        '''
+        Calculate how much each member should pay or recieve, straight from the mapped columns
+        '''
+        balances = [0.0] * len(self.member_names)
+        amounts, payers, offsets, involved = self.amounts, self.payers, self.offsets, self.involved
+
+        for i in range(len(amounts)):
+            amount = amounts[i]
+            start, end = offsets[i], offsets[i + 1]
+            per_person_share = amount / (end - start)
+
+            balances[payers[i]] += amount
+            for member_index in involved[start:end]:
+                balances[member_index] -= per_person_share
+
+        self.balances = balances
+        total = sum(amounts)
+        return total / len(balances) if balances else 0
+
+    def get_balance_list(self):
+        '''
+        Get list of balances in the format needed for settlemnet calculation
+        '''
+        return [
+            {'member_name': name, 'price_to_get': balance}
+            for name, balance in zip(self.member_names, self.balances)
+        ]
+
+    def to_trip(self) -> Trip:
+        '''
+        Rebuild a Trip with regular Payment objects from the mapped ledger
+        '''
+        trip = Trip(self.trip_name)
+        with trip.quiet():
+            for name in self.member_names:
+                trip.add_member(name)
+            for i in range(len(self.amounts)):
+                involved = [self.member_names[j] for j in self.involved[self.offsets[i]:self.offsets[i + 1]]]
+                # rows are trusted as stored: add_payment would put the payer back into their own split
+                payment = Payment(self.member_names[self.payers[i]], self.amounts[i], self.description(i), involved)
+                payment.timestamp = self.timestamps[i]
+                trip.payments.append(payment)
+                trip._index_payment(payment)
+        return trip
+
+    def __repr__(self):
+        return f"MappedLedger(trip_name = '{self.trip_name}', members = {len(self.member_names)}, payments = {len(self)})"
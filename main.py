@@ -9,6 +9,11 @@ BANNER = '''
     Bill splitting, without the confusion.
 '''
 
+def print_event(event) -> None:
+    """Print trip events to the terminal"""
+    print(event.message)
+
+
 def show_menu():
     """Display the main menu options"""
     menu = '''
@@ -53,6 +58,27 @@ def valid_input(prompt, input_type=str, allow_empty=False) -> str|int|float:
             print(f"Invalid input. Please enter a valid {input_type.__name__}.")
     
 
+def handle_remove_member(trip, name) -> None:
+    involved = trip.payments_involving(name)
+    if not involved:
+        trip.remove_member(name)
+        return
+
+    print(f"{name} is involved in {len(involved)} payment(s):")
+    for payment in involved:
+        print(f"  #{payment.id}: {payment.payer_name} paid ${payment.amount:.2f} - {payment.description}")
+    choice = valid_input("(c)ascade delete, (r)eassign to another member, or (k)eep member? ").lower()
+    if choice == 'c':
+        trip.remove_member(name, mode="cascade")
+    elif choice == 'r':
+        new_name = valid_input("Reassign payments to: ")
+        try:
+            trip.remove_member(name, mode="reassign", reassign_to=new_name)
+        except ValueError as e:
+            print(f"Error: {e}")
+    print()
+
+
 def handle_add_payment(trip) -> None:
     if not trip.members:
         print('No members in this group. Add a member first.\n')
@@ -68,14 +94,21 @@ def handle_add_payment(trip) -> None:
         involved_input = input().strip()
         if involved_input:
             involved = [name.strip() for name in involved_input.split(',')]
+
+    recurring_choice = valid_input("Recurring payment (e.g. nightly hotel)? (y/n): ").lower()
     try:
-        trip.add_payment(payer, amount, description, involved)
+        if recurring_choice == 'y':
+            period_days = valid_input("Repeat every how many days? ", input_type=int)
+            count = valid_input("How many times? ", input_type=int)
+            trip.add_recurring_payment(payer, amount, description, involved, period_days=period_days, count=count)
+        else:
+            trip.add_payment(payer, amount, description, involved)
     except ValueError as e:
         print(f"Error: {e}")
 
 
 def handle_edit_payment(trip) -> None:
-    if not trip.payments:
+    if not trip.payments and not trip.recurring_payments:
         print("No payments to edit.\n")
     trip.list_payments()
     print()
@@ -108,7 +141,7 @@ def handle_edit_payment(trip) -> None:
 
 
 def handle_delete_payment(trip) -> None:
-    if not trip.payments:
+    if not trip.payments and not trip.recurring_payments:
         print("No payments to delete.\n")
     trip.list_payments()
     print()
@@ -119,13 +152,13 @@ def handle_delete_payment(trip) -> None:
 
 
 def handle_settlement(trip) -> None:
-    if not trip.payments:
+    if not trip.payments and not trip.recurring_payments:
         print("No payments recorded yet.")
         return
     print("\n" + "=" * 50, "Settletment Summary", "=" * 50,  sep='\n')
 
     avg_per_person = trip.calculate_balances()
-    total_spent = sum(p.amount for p in trip.payments)
+    total_spent = trip.total_spent()
 
     print(f"\nTotal spent: ${total_spent:.2f}", f"Per person (if all shared): ${avg_per_person:.2f}", "\nResult:", sep='\n')
     
@@ -183,6 +216,7 @@ def main():
 
     trip_name = input("Group name (or press Enter for 'My Trip'): ").strip()
     trip = Trip(trip_name or 'My Trip')
+    trip.subscribe(print_event)
     print(f"\n✅ Trip '{trip.trip_name}' created!\n")
 
     while True:
@@ -205,7 +239,7 @@ def main():
                     trip.list_members()
                     print()
                     name = valid_input("Enter name of member to remove: ")
-                    trip.remove_member(name)
+                    handle_remove_member(trip, name)
                 
                 case 4:
                     trip.list_payments()
@@ -1,3 +1,8 @@
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+
 class Member:
     '''
     Represents a trip member
@@ -24,6 +29,7 @@ class Payment:
         self.payer_name = payer_name
         self.amount = float(amount)
         self.description = description
+        self.timestamp = time.time()
         # If no involved members specified, assume it's split among all trip members
         self.involved_members = involved_members if involved_members else []
     
@@ -31,58 +37,286 @@ class Payment:
         involved = f", invloved = {self.involved_members}" if self.involved_members else ""
         return f"Payment(payer = '{self.payer_name}, amount = '{self.amount}', desc = '{self.description}'{involved}"
 
+    @property
+    def total(self) -> float:
+        '''
+        Amount this payment adds to the trip
+        '''
+        return self.amount
+
+
+class RecurringPayment(Payment):
+    '''
+    Represents a cost repeated every period_days, e.g. a nightly hotel rate.
+    Stored as one rule; occurrences are only expanded on demand.
+    '''
+    def __init__(self, payer_name:str, amount:float, description="", involved_members=None,
+                 start:date = None, period_days:int = 1, count:int = None, end:date = None) -> None:
+        if period_days < 1:
+            raise ValueError("period_days must be at least 1")
+        start = start if start else date.today()
+        if count is None:
+            if end is None:
+                raise ValueError("A recurring payment needs a count or an end date")
+            count = (end - start).days // period_days + 1
+        if count < 1:
+            raise ValueError("A recurring payment must occur at least once")
+
+        super().__init__(payer_name, amount, description, involved_members)
+        self.start = start
+        self.period_days = period_days
+        self.count = count
+
+    @property
+    def total(self) -> float:
+        return self.amount * self.count
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.period_days * (self.count - 1))
+
+    def occurrences(self):
+        '''
+        Yield (date, amount) for each occurrence, lazily
+        '''
+        for i in range(self.count):
+            yield (self.start + timedelta(days=self.period_days * i), self.amount)
+
+    def __repr__(self):
+        involved = f", invloved = {self.involved_members}" if self.involved_members else ""
+        return (f"RecurringPayment(payer = '{self.payer_name}, amount = '{self.amount}', desc = '{self.description}'"
+                f", every = {self.period_days} day(s), count = {self.count}{involved}")
+
+
+class TripEvent:
+    '''
+    Something that happened to a trip, published to the trip's subscribers.
+    The message is only formatted when a subscriber reads it.
+    '''
+    def __init__(self, kind:str, template:str, data:dict) -> None:
+        self.kind = kind # e.g. "member.added", "payment.updated"
+        self.template = template
+        self.data = data
+
+    @property
+    def message(self) -> str:
+        return self.template.format(**self.data)
+
+    def __repr__(self):
+        return f"TripEvent(kind = '{self.kind}', data = {self.data})"
+
 
 class Trip:
     '''
     Represents a trip with members and payments.
+    Changes are published as TripEvents to subscribers; with none registered the trip is quiet.
     '''
     def __init__(self, trip_name:str):
         self.trip_name = trip_name
         self.members = {} # name: Member object
         self.payments = []
+        self.recurring_payments = [] # RecurringPayment rules, counted in closed form
+        self.member_payments = {} # name: {payment_id: Payment} the member paid for or shares in
+        self.obligations = {} # debtor: {creditor: amount} owed directly, before any simplification
+        self.subscribers = []
+        self._batch_counts = None # {kind: count} while inside quiet()
+
+    def subscribe(self, callback) -> None:
+        '''
+        Call callback(event) with a TripEvent for every change to this trip
+        '''
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        self.subscribers.remove(callback)
+
+    @contextmanager
+    def quiet(self):
+        '''
+        Mute events for bulk operations. Instead of one event per row,
+        subscribers get a single "batch.done" event with counts when the block ends.
+        '''
+        if self._batch_counts is not None:
+            yield self
+            return
+        self._batch_counts = {}
+        try:
+            yield self
+        finally:
+            counts, self._batch_counts = self._batch_counts, None
+            if counts:
+                summary = ", ".join(f"{count} {kind.replace('.', ' ')}" for kind, count in counts.items())
+                self._emit("batch.done", "Bulk update: {summary}", counts=counts, summary=summary)
+
+    def _emit(self, kind:str, template:str, **data) -> None:
+        if not self.subscribers:
+            return
+        if self._batch_counts is not None:
+            self._batch_counts[kind] = self._batch_counts.get(kind, 0) + 1
+            return
+        event = TripEvent(kind, template, data)
+        for callback in self.subscribers:
+            callback(event)
 
     def list_members(self) -> None:
         if len(self.members) == 0:
-            print("No member in this group.")
+            self._emit("members.listed", "No member in this group.", names=[])
         else:
-            print('Members: ', end=' ')
-            for member in self.members:
-                print(member, end=', ')
+            self._emit("members.listed", "Members: {names_str}",
+                       names=list(self.members), names_str=", ".join(self.members))
     
     def add_member(self, name:str) -> bool:
         if not isinstance(name, str):
             return False
         if name not in self.members:
             self.members[name] = Member(name)
-            print(f"{name} is successfully added.")
+            self.member_payments[name] = {}
+            self._emit("member.added", "{name} is successfully added.", name=name)
             return True
-        print(f"{name} is already in the group.")
+        self._emit("member.exists", "{name} is already in the group.", name=name)
         return False
     
-    def remove_member(self, name:str) -> None:
+    def remove_member(self, name:str, mode:str = "block", reassign_to:str = None) -> bool:
+        '''
+        Remove a member from the trip
+
+        Args:
+            name: Name of the member to remove
+            mode: What to do with payments involving the member
+                "block": refuse to remove while any payment involves them
+                "cascade": delete payments they paid for and drop them from other splits
+                    (a split left empty falls back to the payer alone)
+                "reassign": hand their payments and shares over to reassign_to
+            reassign_to: Member taking over the payments when mode is "reassign"
+        '''
         if not isinstance(name, str):
-            return 
+            return False
         if name not in self.members:
-            print(f"{name} doesn't exist in this group.")
-            return
+            self._emit("member.not_found", "{name} doesn't exist in this group.", name=name)
+            return False
+        if mode not in ("block", "cascade", "reassign"):
+            raise ValueError(f"Unknown removal mode '{mode}'")
+
+        affected = list(self.member_payments[name].values())
+        if affected:
+            if mode == "block":
+                self._emit("member.blocked", "{name} is involved in {count} payment(s) and can't be removed.",
+                           name=name, count=len(affected))
+                return False
+            if mode == "reassign":
+                if reassign_to not in self.members or reassign_to == name:
+                    raise ValueError(f"Cannot reassign {name}'s payments to '{reassign_to}'")
+                for payment in affected:
+                    self._reassign_payment(payment, name, reassign_to)
+            else:
+                for payment in affected:
+                    if payment.payer_name == name:
+                        self._unindex_payment(payment)
+                        self._ledger_for(payment).remove(payment)
+                    else:
+                        self._unindex_payment(payment)
+                        # if nobody else shared it, the payer covers it alone
+                        payment.involved_members = [m for m in payment.involved_members if m != name] or [payment.payer_name]
+                        self._index_payment(payment)
+
         self.members.pop(name)
-        print(f"{name} is successfully removed.")
+        self.member_payments.pop(name)
+        self._emit("member.removed", "{name} is successfully removed.", name=name, mode=mode, affected=len(affected))
+        return True
+
+    def payments_involving(self, name:str) -> list:
+        '''
+        Get the payments a member paid for or shares in
+        '''
+        return list(self.member_payments.get(name, {}).values())
+
+    def _ledger_for(self, payment:Payment) -> list:
+        return self.recurring_payments if isinstance(payment, RecurringPayment) else self.payments
+
+    def get_obligation_matrix(self) -> dict:
+        '''
+        Get who owes whom directly, as a sparse {debtor: {creditor: amount}} dict
+        '''
+        return {debtor: dict(row) for debtor, row in self.obligations.items()}
+
+    def _index_payment(self, payment:Payment) -> None:
+        self.member_payments[payment.payer_name][payment.id] = payment
+        for name in payment.involved_members:
+            self.member_payments[name][payment.id] = payment
+        self._apply_obligations(payment, 1)
+
+    def _unindex_payment(self, payment:Payment) -> None:
+        self.member_payments[payment.payer_name].pop(payment.id, None)
+        for name in payment.involved_members:
+            self.member_payments[name].pop(payment.id, None)
+        self._apply_obligations(payment, -1)
+
+    def _apply_obligations(self, payment:Payment, sign:int) -> None:
+        # every involved member owes the payer their share
+        if not payment.involved_members:
+            return
+        per_person_share = payment.total / len(payment.involved_members)
+        for name in payment.involved_members:
+            if name == payment.payer_name:
+                continue
+            row = self.obligations.setdefault(name, {})
+            amount = row.get(payment.payer_name, 0) + sign * per_person_share
+            if abs(amount) > 1e-9:
+                row[payment.payer_name] = amount
+            else:
+                row.pop(payment.payer_name, None)
+                if not row:
+                    del self.obligations[name]
+
+    def _reassign_payment(self, payment:Payment, old_name:str, new_name:str) -> None:
+        self._unindex_payment(payment)
+        if payment.payer_name == old_name:
+            payment.payer_name = new_name
+        involved = []
+        for name in payment.involved_members:
+            name = new_name if name == old_name else name
+            if name not in involved:
+                involved.append(name)
+        payment.involved_members = involved
+        self._index_payment(payment)
 
     def list_payments(self) -> None:
-        if len(self.payments) == 0:
-            print("No payment records found.")
+        # nobody would see the listing, so don't build it
+        if not self.subscribers:
+            return
+        if len(self.payments) == 0 and len(self.recurring_payments) == 0:
+            self._emit("payments.listed", "No payment records found.", lines=[])
             return
-        print(f"Payments for {self.trip_name}:")
+        lines = [f"Payments for {self.trip_name}:"]
         for payment in self.payments:
             involved_str = ", ".join(payment.involved_members) if payment.involved_members else "all"
-            print(f"  #{payment.id}: {payment.payer_name} paid ${payment.amount:.2f} - {payment.description} (split: {involved_str})")
+            lines.append(f"  #{payment.id}: {payment.payer_name} paid ${payment.amount:.2f} - {payment.description} (split: {involved_str})")
+        for rule in self.recurring_payments:
+            involved_str = ", ".join(rule.involved_members) if rule.involved_members else "all"
+            lines.append(f"  #{rule.id}: {rule.payer_name} pays ${rule.amount:.2f} every {rule.period_days} day(s) x {rule.count}"
+                         f" = ${rule.total:.2f} - {rule.description} (split: {involved_str})")
+        self._emit("payments.listed", "{text}", lines=lines, text="\n".join(lines))
+
+    def iter_payments(self):
+        '''
+        Yield (date, payment, amount) for every payment, with each recurring rule
+        expanded lazily into one entry per occurrence
+        '''
+        for payment in self.payments:
+            yield (datetime.fromtimestamp(payment.timestamp).date(), payment, payment.amount)
+        for rule in self.recurring_payments:
+            for day, amount in rule.occurrences():
+                yield (day, rule, amount)
     
     
     def search_payment(self, payment_id: int) -> Payment:
         for payment in self.payments:
             if  payment.id == payment_id:
                 return payment
-        print(f"Payment #{payment_id} not found.")
+        for rule in self.recurring_payments:
+            if rule.id == payment_id:
+                return rule
+        self._emit("payment.not_found", "Payment #{payment_id} not found.", payment_id=payment_id)
         return None
     
     def add_payment(self, payer_name, amount, description="", involved_members=None) -> Payment:
@@ -95,6 +329,38 @@ class Trip:
             description: Description of the payment
             involved_members: List of member names who share this expense. If none, all members share it.
         '''
+        involved_members = self._validate_split(payer_name, involved_members)
+        payment = Payment(payer_name, amount, description, involved_members)
+        self.payments.append(payment)
+        self._index_payment(payment)
+        self._emit("payment.added", "Payment #{payment_id} recorded: {payer_name} paid ${amount:.2f}",
+                   payment_id=payment.id, payer_name=payer_name, amount=payment.amount)
+        return payment
+
+    def add_recurring_payment(self, payer_name, amount, description="", involved_members=None,
+                              start:date = None, period_days:int = 1, count:int = None, end:date = None) -> RecurringPayment:
+        '''
+        Add a cost that repeats every period_days, stored as a single rule
+
+        Args:
+            payer_name: Name of the person who pays
+            amount: Amount paid each time
+            description: Description of the payment
+            involved_members: List of member names who share this expense. If none, all members share it.
+            start: Date of the first occurrence, defaults to today
+            period_days: Days between occurrences
+            count: Number of occurrences
+            end: Last possible date, used when count is not given
+        '''
+        involved_members = self._validate_split(payer_name, involved_members)
+        rule = RecurringPayment(payer_name, amount, description, involved_members, start, period_days, count, end)
+        self.recurring_payments.append(rule)
+        self._index_payment(rule)
+        self._emit("payment.added", "Payment #{payment_id} recorded: {payer_name} pays ${amount:.2f} x {count}",
+                   payment_id=rule.id, payer_name=payer_name, amount=rule.amount, count=rule.count)
+        return rule
+
+    def _validate_split(self, payer_name, involved_members) -> list:
         if payer_name not in self.members:
             raise ValueError(f"Member '{payer_name}' not found in trip")
         
@@ -108,10 +374,7 @@ class Trip:
                 # ensure the payer is in involved list
             if payer_name not in involved_members:
                 involved_members.append(payer_name)
-        
-        payment = Payment(payer_name, amount, description, involved_members)
-        self.payments.append(payment)
-        return payment
+        return involved_members
     
     
     def edit_payment(self, payment_id: int, new_amount: float, new_description: str, new_involved_members: list = None) -> None:
@@ -120,29 +383,38 @@ class Trip:
             return
         if new_amount is not None:
             try:
-                payment_to_edit.amount = float(new_amount)
-                print(f'Payment #{payment_id} amount is successfully updated.')
+                new_amount = float(new_amount)
+                self._unindex_payment(payment_to_edit)
+                payment_to_edit.amount = new_amount
+                self._index_payment(payment_to_edit)
+                self._emit("payment.updated", "Payment #{payment_id} amount is successfully updated.",
+                           payment_id=payment_id, field="amount")
             except ValueError:
-                print(f"Invalid amount: {new_amount}")
+                self._emit("payment.invalid", "Invalid amount: {amount}", payment_id=payment_id, amount=new_amount)
         if new_description is not None:
             payment_to_edit.description = new_description
-            print(f'Payment #{payment_id} description is successfully updated.')
+            self._emit("payment.updated", "Payment #{payment_id} description is successfully updated.",
+                       payment_id=payment_id, field="description")
         
         if new_involved_members is not None:
             for name in new_involved_members:
                 if name not in self.members:
-                    print(f'Error: \'{name}\' not found in trip')
+                    self._emit("payment.invalid", "Error: '{name}' not found in trip", payment_id=payment_id, name=name)
                     return
+            self._unindex_payment(payment_to_edit)
             payment_to_edit.involved_members = new_involved_members
-            print(f"Payment #{payment_id} involved members successfully updated.")
+            self._index_payment(payment_to_edit)
+            self._emit("payment.updated", "Payment #{payment_id} involved members successfully updated.",
+                       payment_id=payment_id, field="involved_members")
     
 
     def delete_payment(self, payment_id: int) -> None:
         payment_to_delete = self.search_payment(payment_id)
         if payment_to_delete is None:
             return
-        self.payments.remove(payment_to_delete)
-        print(f'Payment #{payment_id} is successfully deleted.')
+        self._ledger_for(payment_to_delete).remove(payment_to_delete)
+        self._unindex_payment(payment_to_delete)
+        self._emit("payment.deleted", "Payment #{payment_id} is successfully deleted.", payment_id=payment_id)
     
 
     def calculate_balances(self):
@@ -152,22 +424,25 @@ class Trip:
         for member in self.members.values():
             member.balance = 0
 
-        # process each payment
-        for payment in self.payments:
+        # process each payment; a recurring rule counts once with its total
+        for payment in self.payments + self.recurring_payments:
              # calculate per-person share for this payment
             num_involved = len(payment.involved_members)
-            per_person_share = payment.amount / num_involved
+            per_person_share = payment.total / num_involved
 
             # the payer gets credited for the full amount
-            self.members[payment.payer_name].balance += payment.amount
+            self.members[payment.payer_name].balance += payment.total
 
             # each involved member (including payer) gets debited their share
             for member_name in payment.involved_members:
                 self.members[member_name].balance -= per_person_share
         
         # return average spent per person
-        total = sum(p.amount for p in self.payments)
+        total = self.total_spent()
         return total / len(self.members) if self.members else 0
+
+    def total_spent(self) -> float:
+        return sum(p.amount for p in self.payments) + sum(r.total for r in self.recurring_payments)
     
 
     def get_balance_list(self):
@@ -180,4 +455,4 @@ class Trip:
         ]
     
     def __repr__(self):
-        return f"Trip(trip_name = '{self.trip_name}', members = {len(self.members)}, payments = {len(self.payments)})"
\ No newline at end of file
+        return f"Trip(trip_name = '{self.trip_name}', members = {len(self.members)}, payments = {len(self.payments)}, recurring = {len(self.recurring_payments)})"
\ No newline at end of file
@@ -0,0 +1,153 @@
+'''
+Cross-trip netting for people who share many trips
+
+Instead of settling every Trip on its own, the ledger adds up each person's
+balance across all registered trips and settles the net positions in one pass.
+People are matched across trips by member name.
+'''
+import heapq
+
+from models import Trip
+
+
+def _to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+class NettingLedger:
+    '''
+    Aggregates balances of many trips and settles them globally
+    '''
+    def __init__(self) -> None:
+        self.trip_balances = {} # trip_key: {name: cents}
+        self.contributions = {} # name: {trip_key: cents}
+        self.positions = {} # name: net cents, only non-zero positions are kept
+
+    def update_trip(self, trip: Trip, trip_key: str = None) -> None:
+        '''
+        Add a trip, or refresh it after it changed.
+        Only the members of this trip are touched.
+
+        Args:
+            trip: The trip to (re)register
+            trip_key: Unique key for the trip, defaults to its name
+        '''
+        key = trip_key if trip_key is not None else trip.trip_name
+        trip.calculate_balances()
+        new = {}
+        for name, member in trip.members.items():
+            cents = _to_cents(member.balance)
+            if cents:
+                new[name] = cents
+        self._apply(key, new)
+
+    def remove_trip(self, trip_key: str) -> None:
+        if trip_key not in self.trip_balances:
+            raise KeyError(f"Trip '{trip_key}' is not in the ledger")
+        self._apply(trip_key, {})
+
+    def _apply(self, key: str, new: dict) -> None:
+        old = self.trip_balances.get(key, {})
+        for name in old.keys() | new.keys():
+            delta = new.get(name, 0) - old.get(name, 0)
+            if delta == 0:
+                continue
+
+            position = self.positions.get(name, 0) + delta
+            if position:
+                self.positions[name] = position
+            else:
+                self.positions.pop(name, None)
+
+            per_trip = self.contributions.setdefault(name, {})
+            if name in new:
+                per_trip[key] = new[name]
+            else:
+                per_trip.pop(key, None)
+                if not per_trip:
+                    del self.contributions[name]
+
+        if new:
+            self.trip_balances[key] = new
+        else:
+            self.trip_balances.pop(key, None)
+
+    def get_balance_list(self):
+        '''
+        Get the net positions in the format needed for settlement calculation
+        '''
+        return [
+            {'member_name': name, 'price_to_get': cents / 100}
+            for name, cents in self.positions.items()
+        ]
+
+    def settle(self) -> tuple:
+        '''
+        Settle all net positions in one pass.
+        Uses the same greedy strategy as calculate_settlements: always settle
+        the largest creditor with the largest debtor.
+
+        Returns:
+            tuple: (final_balances, settlements)
+                - final_balances: List of remaining balances
+                - settlements: List of transactions needed, each with the
+                  'trips' whose debts and credits it covers
+        '''
+        creditors = [(-cents, name) for name, cents in self.positions.items() if cents > 0]
+        debtors = [(cents, name) for name, cents in self.positions.items() if cents < 0]
+        heapq.heapify(creditors)
+        heapq.heapify(debtors)
+        remaining = dict(self.positions)
+
+        # Per person, the trips that caused their credit or debt, largest last
+        sources = {}
+        for name, cents in self.positions.items():
+            sign = 1 if cents > 0 else -1
+            sources[name] = sorted(
+                ([trip_key, abs(amount)] for trip_key, amount in self.contributions[name].items()
+                 if amount * sign > 0),
+                key=lambda source: source[1]
+            )
+
+        settlements = []
+        while creditors and debtors:
+            credit, creditor = heapq.heappop(creditors)
+            debt, debtor = heapq.heappop(debtors)
+            amount = min(-credit, -debt)
+
+            remaining[creditor] -= amount
+            remaining[debtor] += amount
+            if remaining[creditor]:
+                heapq.heappush(creditors, (-remaining[creditor], creditor))
+            if remaining[debtor]:
+                heapq.heappush(debtors, (remaining[debtor], debtor))
+
+            trips = self._drain(sources[debtor], amount) | self._drain(sources[creditor], amount)
+            settlements.append({
+                'debtor': debtor,
+                'creditor': creditor,
+                'amount': amount / 100,
+                'trips': sorted(trips)
+            })
+
+        final_balances = [
+            {'member_name': name, 'price_to_get': cents / 100}
+            for name, cents in remaining.items()
+        ]
+        return (final_balances, settlements)
+
+    @staticmethod
+    def _drain(sources: list, amount: int) -> set:
+        trips = set()
+        while sources and amount > 0:
+            source = sources[-1]
+            used = min(source[1], amount)
+            trips.add(source[0])
+            source[1] -= used
+            amount -= used
+            if source[1] == 0:
+                sources.pop()
+        return trips
+
+    def __repr__(self):
+        return f"NettingLedger(trips = {len(self.trip_balances)}, open_positions = {len(self.positions)})"
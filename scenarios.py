@@ -0,0 +1,173 @@
+'''
+What-if scenarios evaluated as deltas on a shared base balance vector
+
+A scenario never copies the Trip. It only looks at the payments it touches
+and adds their change in balance on top of the trip's current balances.
+'''
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+from models import Trip
+from calculator import calculate_settlements
+
+
+def _payment_effect(payer_name: str, amount: float, involved_members: list, effect: dict, sign: int = 1) -> None:
+    '''
+    Add (sign=1) or remove (sign=-1) a payment's effect on balances into effect
+    '''
+    per_person_share = amount / len(involved_members)
+    effect[payer_name] = effect.get(payer_name, 0) + sign * amount
+    for name in involved_members:
+        effect[name] = effect.get(name, 0) - sign * per_person_share
+
+
+class Scenario:
+    '''
+    Describes one what-if as a list of changes to a trip.
+    Changes are applied in order, so "drop Bob" followed by
+    "resplit the hotel" sees the hotel without Bob.
+    '''
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.changes = []
+
+    def without_member(self, member_name: str) -> 'Scenario':
+        '''
+        The member leaves: payments they made are dropped and they are taken out of every other split
+        '''
+        self.changes.append(('member', member_name, None))
+        return self
+
+    def without_payment(self, payment_id: int) -> 'Scenario':
+        self.changes.append(('drop', payment_id, None))
+        return self
+
+    def resplit_payment(self, payment_id: int, involved_members: list) -> 'Scenario':
+        self.changes.append(('resplit', payment_id, list(involved_members)))
+        return self
+
+    def delta(self, trip: Trip) -> tuple:
+        '''
+        Work out the balance changes this scenario makes to trip
+
+        Returns:
+            tuple: (delta, removed_members)
+                - delta: {member_name: change in balance}, only for touched members
+                - removed_members: set of members who left the trip
+        '''
+        overrides = {} # payment_id: (payer_name, amount, involved_members) or None if dropped
+        originals = {}
+        removed = set()
+
+        def current(payment):
+            originals.setdefault(payment.id, payment)
+            if payment.id in overrides:
+                return overrides[payment.id]
+            return (payment.payer_name, payment.total, payment.involved_members)
+
+        for kind, target, involved in self.changes:
+            if kind == 'member':
+                if target not in trip.members:
+                    raise ValueError(f"'{target}' not found in trip")
+                removed.add(target)
+                # the index only knows the ledger; earlier changes may have added target to other splits
+                affected = {payment.id: payment for payment in trip.payments_involving(target)}
+                for payment_id, state in overrides.items():
+                    if state is not None and target in state[2]:
+                        affected[payment_id] = originals[payment_id]
+                for payment in affected.values():
+                    state = current(payment)
+                    if state is None:
+                        continue
+                    if state[0] == target:
+                        overrides[payment.id] = None
+                    else:
+                        # if nobody else shared it, the payer covers it alone
+                        involved = [m for m in state[2] if m != target] or [state[0]]
+                        overrides[payment.id] = (state[0], state[1], involved)
+            else:
+                payment = trip.search_payment(target)
+                if payment is None:
+                    raise ValueError(f"Payment #{target} not found")
+                state = current(payment)
+                if kind == 'drop' or state is None:
+                    overrides[payment.id] = None
+                else:
+                    for name in involved:
+                        if name not in trip.members or name in removed:
+                            raise ValueError(f"'{name}' not found in trip")
+                    if state[0] not in involved:
+                        involved = involved + [state[0]]
+                    overrides[payment.id] = (state[0], state[1], involved)
+
+        delta = {}
+        for payment_id, state in overrides.items():
+            payment = originals[payment_id]
+            _payment_effect(payment.payer_name, payment.total, payment.involved_members, delta, sign=-1)
+            if state is not None:
+                _payment_effect(*state, delta)
+        return delta, removed
+
+    def __repr__(self):
+        return f"Scenario(name = '{self.name}', changes = {len(self.changes)})"
+
+
+class ScenarioBase:
+    '''
+    Read-only snapshot of a trip's balances that scenarios are evaluated against
+    '''
+    def __init__(self, trip: Trip) -> None:
+        self.trip = trip
+        self.average = trip.calculate_balances()
+        self.balances = MappingProxyType({name: member.balance for name, member in trip.members.items()})
+
+    def balance_list(self, scenario: Scenario) -> list[dict]:
+        '''
+        Base balances with the scenario's delta applied, in the format needed for settlement calculation
+        '''
+        delta, removed = scenario.delta(self.trip)
+        balance_list = [
+            {'member_name': name, 'price_to_get': balance + delta.get(name, 0)}
+            for name, balance in self.balances.items()
+            if name not in removed
+        ]
+        # a scenario only moves money around; anything left over would vanish from the settlement
+        leftover = sum(b['price_to_get'] for b in balance_list)
+        if abs(leftover) >= 0.005:
+            raise ValueError(f"Scenario '{scenario.name}' balances don't add up to zero (off by {leftover:.2f}).")
+        return balance_list
+
+
+def _settle(scenario_name: str, balance_list: list[dict]) -> dict:
+    if balance_list:
+        final_balances, settlements = calculate_settlements(balance_list)
+    else:
+        settlements = []
+    return {
+        'scenario': scenario_name,
+        'balances': balance_list,
+        'settlements': settlements
+    }
+
+
+def evaluate_scenarios(trip: Trip, scenarios: list[Scenario], executor=None) -> list[dict]:
+    '''
+    Evaluate a batch of scenarios against the same base balances
+
+    Args:
+        trip: Trip the scenarios are about; it is not modified
+        scenarios: Scenarios to evaluate
+        executor: concurrent.futures executor for the settlement step.
+            Defaults to a thread pool; pass a ProcessPoolExecutor for CPU parallelism on big groups.
+
+    Returns:
+        List of dicts with 'scenario', 'balances' and 'settlements', in the order of scenarios
+    '''
+    base = ScenarioBase(trip)
+    balance_lists = [base.balance_list(scenario) for scenario in scenarios]
+    names = [scenario.name for scenario in scenarios]
+
+    if executor is None:
+        with ThreadPoolExecutor() as pool:
+            return list(pool.map(_settle, names, balance_lists))
+    return list(executor.map(_settle, names, balance_lists))